@@ -1,57 +1,174 @@
 import os
 import io
 import av
-import base64
+import orjson
+import openai
+import aiohttp
+import queue
+import httpx
 import asyncio
-import requests
+import threading
 import pandas as pd
 from utils import *
 import streamlit as st
 from stqdm import stqdm
-from pathlib import Path
 from datetime import datetime
+from contextvars import ContextVar
 from openai import AsyncOpenAI
 
 UTC_TIMESTAMP = int(datetime.utcnow().timestamp())
 
-client = AsyncOpenAI()
+BATCH_FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
 
+VOICE_COLUMNS = ("category", "age", "gender", "accent", "description", "use case")
 
-@st.cache_data(show_spinner=False)
-def extract_audio(video_file):
+# OpenAI client shared by every call within one script run, set by run()
+OPENAI_CLIENT: ContextVar[AsyncOpenAI] = ContextVar("OPENAI_CLIENT")
+
+
+def openai_client() -> AsyncOpenAI:
+    return OPENAI_CLIENT.get()
+
+
+def remux_audio(video_container, audio_in, audio_container, progress):
+    # Copy the compressed packets over as-is, only the container headers get rewritten
+    # PyAV 14 replaced add_stream(template=...) with add_stream_from_template()
+    if hasattr(audio_container, "add_stream_from_template"):
+        audio_out = audio_container.add_stream_from_template(audio_in)
+    else:
+        audio_out = audio_container.add_stream(template=audio_in)
+    # Only push progress to the UI every PROGRESS_INTERVAL packets
+    copied = reported = 0
+    for packet in video_container.demux(audio_in):
+        # Skip the empty packets the demuxer emits when flushing
+        if packet.dts is None:
+            continue
+        packet.stream = audio_out
+        audio_container.mux(packet)
+        copied += 1
+        if copied % PROGRESS_INTERVAL == 0:
+            progress.update(copied - reported)
+            reported = copied
+    progress.update(copied - reported)
+
+
+def transcode_audio(video_container, audio_in, audio_container, progress):
+    audio_out = audio_container.add_stream("mp3")
+    audio_out.bit_rate = AUDIO_BITRATE
+    audio_out.codec_context.thread_type = "AUTO"
+
+    # Encode and mux in a worker thread so it overlaps with decoding on this thread
+    frames = queue.Queue(maxsize=32)
+    errors = []
+
+    def encode_worker():
+        try:
+            while (frame := frames.get()) is not None:
+                for packet in audio_out.encode(frame):
+                    audio_container.mux(packet)
+        except Exception as e:
+            errors.append(e)
+            # Keep draining so the decoding side never blocks on a full queue
+            while frames.get() is not None:
+                pass
+
+    worker = threading.Thread(target=encode_worker, daemon=True)
+    worker.start()
+    # Only push progress to the UI every PROGRESS_INTERVAL frames
+    decoded = reported = 0
+    try:
+        for frame in video_container.decode(audio_in):
+            frame.pts = None
+            frames.put(frame)
+            decoded += 1
+            if decoded % PROGRESS_INTERVAL == 0:
+                progress.update(decoded - reported)
+                reported = decoded
+        progress.update(decoded - reported)
+    finally:
+        frames.put(None)
+        worker.join()
+    if errors:
+        raise errors[0]
+
+    for packet in audio_out.encode(None):
+        audio_container.mux(packet)
+
+
+@st.cache_resource
+def get_audio_store() -> AudioStore:
+    # Generated audio shared across sessions, session state only keeps the digests
+    return AudioStore(AUDIO_STORE_BYTES)
+
+
+@st.cache_resource
+def get_transcription_cache() -> LRUCache:
+    # Transcripts shared across sessions, keyed by the digest of the audio bytes
+    return LRUCache(TRANSCRIPTION_CACHE_SIZE)
+
+
+@st.cache_resource
+def get_translation_cache() -> LRUCache:
+    # Translations shared across sessions, keyed by (target language, whitespace-normalized source text)
+    return LRUCache(TRANSLATION_CACHE_SIZE)
+
+
+def extract_audio(video_file) -> io.BytesIO:
+    # Key the cache on an xxh3 digest of the upload's bytes (zero-copy) instead of Streamlit's own hashing.
+    # The cached bytes are shared by all sessions, so each caller gets its own buffer (and read position) over them
+    return io.BytesIO(_extract_audio(digest(video_file.getbuffer()), _video_file=video_file))
+
+
+@st.cache_resource(show_spinner=False)
+def _extract_audio(key, _video_file) -> bytes:
     # Use PyAV to open the input video file, extract the audio stream, output to memory buffer and return it
-    video_container = av.open(video_file)
+    video_container = av.open(_video_file)
     audio_in = video_container.streams.get(audio=0)[0]
-
-    audio_buffer = io.BytesIO()
+    # Let FFmpeg pick the threading mode and thread count for decoding
+    audio_in.codec_context.thread_type = "AUTO"
+    audio_in.codec_context.thread_count = 0
+
+    # MP3 sources only need their packets copied into the new container, anything else is re-encoded
+    remux = audio_in.codec_context.name == "mp3"
+    bit_rate = (audio_in.codec_context.bit_rate or AUDIO_BITRATE) if remux else AUDIO_BITRATE
+
+    # Reserve the expected MP3 size up front so muxing doesn't keep regrowing the buffer
+    if video_container.duration is not None:
+        duration = video_container.duration / av.time_base
+    elif audio_in.duration is not None:
+        duration = float(audio_in.duration * audio_in.time_base)
+    else:
+        duration = 0
+    audio_buffer = PreallocatedBuffer(int(duration * bit_rate / 8) + 64 * 1024)
     with av.open(audio_buffer, "w", "mp3") as audio_container:
-        audio_out = audio_container.add_stream("mp3")
-
         # Get the length of all frames in the video for the progress bar
         total_frames = audio_in.frames
+        progress = stqdm(total=total_frames, desc="Extracting audio...", mininterval=1)
+        try:
+            if remux:
+                remux_audio(video_container, audio_in, audio_container, progress)
+            else:
+                transcode_audio(video_container, audio_in, audio_container, progress)
+        finally:
+            progress.close()
 
-        for frame in stqdm(video_container.decode(audio_in), total=total_frames, desc="Extracting audio...", mininterval=1):
-            frame.pts = None
-            for packet in audio_out.encode(frame):
-                audio_container.mux(packet)
-        
-        for packet in audio_out.encode(None):
-            audio_container.mux(packet)
-
-    audio_buffer.seek(0)
-    return audio_buffer
+    audio_buffer.finalize()
+    return audio_buffer.getvalue()
 
 
-@st.cache_data(show_spinner=False)
+@st.cache_resource(show_spinner=False)
 def build_voices_dataframe(
     voices: dict
 ) -> pd.DataFrame:
-    voices_copy = voices.copy()
-    # Move any sub key-value pairs from under "labels" key to the root level, also delete the key "fine_tuning"
-    for voice in voices_copy.values():
-        voice.update(voice.pop("labels"))
-        voice.pop("fine_tuning")
-    return pd.DataFrame(voices_copy.values())[["name", "category", "age", "gender", "accent", "description", "use case"]].set_index("name")
+    # Flatten the "labels" sub-dict into "labels.*" columns in one pass, without mutating the voices themselves
+    df = pd.json_normalize(list(voices.values()), max_level=1).set_index("name")
+    for column in VOICE_COLUMNS:
+        label = f"labels.{column}"
+        if label not in df.columns:
+            continue
+        # Labels take precedence over top-level fields of the same name (e.g. "description")
+        df[column] = df[label].combine_first(df[column]) if column in df.columns else df[label]
+    return df.reindex(columns=VOICE_COLUMNS)
 
 
 @retry(stop=stop_after_attempt(RETRIES), wait=wait_exponential(multiplier=BACKOFF, min=DELAY), reraise=True, retry_error_callback=logger.error)
@@ -62,54 +179,186 @@ async def recognize_speech(
     if "RECOGNIZED_TEXT" in st.session_state:
         return st.session_state["RECOGNIZED_TEXT"]
     
-    file_size = len(audio.getvalue())
+    # Measure the buffer by seeking instead of copying it out with getvalue()
+    file_size = audio.seek(0, io.SEEK_END)
+    audio.seek(0)
     if file_size > 25 * 1024 * 1024:
         st.error(f"Audio file size exceeds 25MB limit. Please upload a smaller file.")
         st.stop()
 
-    # Call the OpenAI API to recognize speech
-    transcript = await client.audio.transcriptions.create(
-        model="whisper-1",  # Only this one available for now
-        file=("audio.mp3", audio)
-    )
-    try:
-        transcript = transcript.text
-    except:
-        transcript = transcript["text"] if "text" in transcript else transcript
+    # Identical audio has been transcribed before (possibly in another session)
+    cache = get_transcription_cache()
+    key = digest(audio.getbuffer())
+    if (transcript := cache.get(key)) is not None:
+        return transcript
+
+    # Call the OpenAI API to recognize speech, streaming the buffer straight into the multipart body
+    url = "https://api.openai.com/v1/audio/transcriptions"
+    headers = {
+        "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}",
+    }
+    form_data = aiohttp.FormData()
+    form_data.add_field("model", "whisper-1")  # Only this one available for now
+    form_data.add_field("file", audio, filename="audio.mp3", content_type="audio/mpeg")
+    response = await call_api_once("POST", url, headers=headers, data=form_data)
+    transcript = response["text"]
+    cache.put(key, transcript)
     return transcript
 
 
-@retry(stop=stop_after_attempt(RETRIES), wait=wait_exponential(multiplier=BACKOFF, min=DELAY), reraise=True, retry_error_callback=logger.error)
-async def translate_text(
+def translation_request(
     src_text: str,
     dst_lang: str,
-) -> str:
-    if "TRANSLATED_TEXT" in st.session_state:
-        return st.session_state["TRANSLATED_TEXT"]
-    
-    # Call the OpenAI API to translate text
+) -> dict:
+    # Build the chat completion request body used for translating a piece of text
     messages = [
         {"role": "system", "content": f"You are a highly skilled professional translator that understands every nuance of different languages and can create translations from user-provided source material that are indistinguishable from native speakers. The source material might come from an audio transcription (either edited or not) so it may require some cleaning or best effort interpretation. Skip filler words like 'um', 'erm' to create a professional, flowing translation instead. Source language: [ Auto-Detect ] Target language: [ {dst_lang} ]"},
         {"role": "user", "content": src_text}
     ]
-    response = await client.chat.completions.create(
-        model="gpt-4-1106-preview",
-        messages=messages,
-        max_tokens=4000,
-    )
+    return {
+        "model": "gpt-4-1106-preview",
+        "messages": messages,
+        "max_tokens": 4000,
+    }
+
+
+@retry(stop=stop_after_attempt(RETRIES), wait=wait_exponential(multiplier=BACKOFF, min=DELAY), reraise=True, retry_error_callback=logger.error)
+async def translate_single(
+    src_text: str,
+    dst_lang: str,
+) -> str:
+    # Call the OpenAI API to translate text
+    response = await openai_client().chat.completions.create(**translation_request(src_text, dst_lang))
     return response.choices[0].message.content.strip()
 
 
+async def translate_text(
+    src_text: str,
+    dst_lang: str,
+) -> str | None:
+    if "TRANSLATED_TEXT" in st.session_state:
+        return st.session_state["TRANSLATED_TEXT"]
+
+    # Reuse a cached translation of the same text into the same language, ignoring whitespace-only differences
+    cache = get_translation_cache()
+    key = (dst_lang.strip().lower(), " ".join(src_text.split()))
+    if (translation := cache.get(key)) is not None:
+        return translation
+
+    # Longer transcripts are split into paragraphs and translated through the Batch API, which is not retried
+    # (each attempt would submit and pay for a new batch); a failed batch falls back to a single request
+    chunks = [chunk.strip() for chunk in src_text.split("\n\n") if chunk.strip()]
+    if len(chunks) >= BATCH_MIN_CHUNKS:
+        try:
+            translations = await translate_chunks(chunks, dst_lang, key)
+        except (RuntimeError, openai.APIError) as e:
+            logger.error(e)
+            translation = await translate_single(src_text, dst_lang)
+        else:
+            if translations is None:
+                # The batch is still running, check on it again in a later run
+                return None
+            translation = "\n\n".join(translations)
+    else:
+        translation = await translate_single(src_text, dst_lang)
+    cache.put(key, translation)
+    return translation
+
+
+async def delete_files(*file_ids: str | None):
+    # Best effort clean-up of uploaded and generated OpenAI files
+    for file_id in file_ids:
+        if file_id is None:
+            continue
+        try:
+            await openai_client().files.delete(file_id)
+        except openai.APIError as e:
+            logger.warning(e)
+
+
+async def translate_chunks(
+    chunks: list[str],
+    dst_lang: str,
+    key: tuple[str, str],
+) -> list[str] | None:
+    # Translate the chunks as one OpenAI batch job without blocking the script run: the first call submits
+    # the batch and returns None, later runs check on it once and return the translations when it has finished
+    pending = st.session_state.get("TRANSLATION_BATCH")
+    if pending is not None and pending["key"] != key:
+        # The text or target language changed since the batch was submitted, so it is no longer needed
+        del st.session_state["TRANSLATION_BATCH"]
+        try:
+            await openai_client().batches.cancel(pending["id"])
+        except openai.APIError as e:
+            # It may have finished in the meantime, nothing left to cancel then
+            logger.warning(e)
+        finally:
+            await delete_files(pending["input_file_id"])
+        pending = None
+
+    if pending is None:
+        lines = [
+            orjson.dumps({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": translation_request(chunk, dst_lang),
+            })
+            for i, chunk in enumerate(chunks)
+        ]
+        batch_file = await openai_client().files.create(
+            file=("translations.jsonl", b"\n".join(lines)),
+            purpose="batch",
+        )
+        try:
+            batch = await openai_client().batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h",
+            )
+        except BaseException:
+            await delete_files(batch_file.id)
+            raise
+        st.session_state["TRANSLATION_BATCH"] = {"id": batch.id, "input_file_id": batch_file.id, "key": key}
+        return None
+
+    batch = await openai_client().batches.retrieve(pending["id"])
+    if batch.status not in BATCH_FINAL_STATUSES:
+        return None
+    del st.session_state["TRANSLATION_BATCH"]
+    try:
+        if batch.status != "completed" or batch.output_file_id is None:
+            raise RuntimeError(f"Translation batch {batch.id} ended with status {batch.status}")
+        output = await openai_client().files.content(batch.output_file_id)
+    finally:
+        # The batch is done with, don't leave its files behind in the account's storage
+        await delete_files(pending["input_file_id"], batch.output_file_id, batch.error_file_id)
+
+    # Results come back in arbitrary order, put them back in chunk order by custom_id
+    translations = [None] * len(chunks)
+    for line in output.text.splitlines():
+        if not line.strip():
+            continue
+        result = orjson.loads(line)
+        if result.get("error") or result["response"]["status_code"] != 200:
+            raise RuntimeError(f"Translation batch request {result['custom_id']} failed: {result.get('error') or result['response']['body']}")
+        translations[int(result["custom_id"])] = result["response"]["body"]["choices"][0]["message"]["content"].strip()
+    if None in translations:
+        raise RuntimeError(f"Translation batch {batch.id} is missing results for some chunks")
+    return translations
+
+
 async def get_voices():
-    # Get a list of currently available voices
+    if "VOICES" in st.session_state:
+        return st.session_state["VOICES"]
+
+    # Get a list of currently available voices (v1 returns all of them in a single response)
     url = "https://api.elevenlabs.io/v1/voices"
     headers = {
         "xi-api-key": os.getenv("ELEVEN_API_KEY"),
     }
-    voice_list = []
-    async for response in call_api("GET", url, headers=headers):
-        voice_list.extend(response["voices"])
-    voices = {voice["name"]: voice for voice in voice_list}
+    response = await call_api_once("GET", url, headers=headers)
+    voices = {voice["name"]: voice for voice in response["voices"]}
     return voices
 
 
@@ -124,18 +373,15 @@ async def create_voice_clone(
     headers = {
         "xi-api-key": os.getenv("ELEVEN_API_KEY"),
     }
-    # Convert the input audio into an UploadFile object
-    data = {
-        "name": name,
-        "description": description,
-    }
-    files = [
-        ("files", ("audio.mp3", audio, "audio/mpeg"))
-    ]
-    response = requests.request("POST", url, headers=headers, data=data, files=files)
-    if response.status_code != 200:
-        raise RuntimeError(f"API call failed with status {response.status_code}: {response.text}")
-    return response.json()["voice_id"]
+    # The buffer may already have been read (preview, Whisper, an earlier attempt)
+    audio.seek(0)
+    # Stream the in-memory audio as a multipart file field over the shared session
+    form_data = aiohttp.FormData()
+    form_data.add_field("name", name)
+    form_data.add_field("description", description)
+    form_data.add_field("files", audio, filename="audio.mp3", content_type="audio/mpeg")
+    response = await call_api_once("POST", url, headers=headers, data=form_data)
+    return response["voice_id"]
 
 
 @retry(stop=stop_after_attempt(RETRIES), wait=wait_exponential(multiplier=BACKOFF, min=DELAY), reraise=True, retry_error_callback=logger.error)
@@ -155,19 +401,30 @@ async def generate_voice(
         "model_id": "eleven_multilingual_v2",
         "text": text,
     }
-    async for response in call_api("POST", url, headers=headers, data=data):
-        audio = response
-    return audio
+    return await call_api_once("POST", url, headers=headers, data=data)
 
 
-def create_download_link(data, filename):
-    if isinstance(data, bytes):
-        b64 = base64.b64encode(data).decode()
-    else:
-        b64 = base64.b64encode(data.encode()).decode()
-    ext = Path(filename).suffix[1:]
-    href = f'<a href="data:file/{ext};base64,{b64}" download="{filename}">Download as {ext} file</a>'
-    return href
+def cancel_inflight(key: str):
+    # Cancel a task started by an earlier script run that is still waiting on its API call
+    task = st.session_state.setdefault("_inflight", {}).pop(key, None)
+    if task is not None and not task.done():
+        # The task may belong to another run's event loop, so cancel it from within that loop
+        task.get_loop().call_soon_threadsafe(task.cancel)
+
+
+async def submit(
+    key: str,
+    coro,
+):
+    # Run a paid API call as the single inflight task for its key, so a later run can cancel it
+    cancel_inflight(key)
+    task = asyncio.create_task(coro)
+    st.session_state["_inflight"][key] = task
+    try:
+        return await task
+    finally:
+        if st.session_state["_inflight"].get(key) is task:
+            del st.session_state["_inflight"][key]
 
 
 def reset_session_state():
@@ -177,6 +434,8 @@ def reset_session_state():
         del st.session_state["TRANSLATED_TEXT"]
     if "GENERATED_AUDIO" in st.session_state:
         del st.session_state["GENERATED_AUDIO"]
+    if "VOICES" in st.session_state:
+        del st.session_state["VOICES"]
 
 
 ############
@@ -232,16 +491,21 @@ async def main():
         st.write("**Step 2: Extract audio from video and transcribe it**")
         audio = extract_audio(uploaded_file)
         with st.expander("Preview Audio"):
+            audio.seek(0)
             st.audio(audio, format="audio/mp3")
         send_to_whisper = st.button("Send to Whisper for transcription")
     
     if "RECOGNIZED_TEXT" not in st.session_state and not send_to_whisper:
         st.stop()
 
-    tasks = [get_voices(), recognize_speech(audio)]
     with st.spinner("Loading..."):
-        voices, recognized_text = await asyncio.gather(*tasks)
+        voices, recognized_text = await asyncio.gather(
+            submit("VOICES", get_voices()),
+            submit("RECOGNIZED_TEXT", recognize_speech(audio)),
+        )
 
+    if "VOICES" not in st.session_state:
+        st.session_state["VOICES"] = voices
     if "RECOGNIZED_TEXT" not in st.session_state:
         st.session_state["RECOGNIZED_TEXT"] = recognized_text
 
@@ -263,7 +527,10 @@ async def main():
             submit_voice_clone = st.form_submit_button("Submit")
         if submit_voice_clone:
             with st.spinner("Creating voice clone..."):
-                st.session_state["VOICE_CLONE_ID"] = await create_voice_clone(name, description, audio)
+                st.session_state["VOICE_CLONE_ID"] = await submit("VOICE_CLONE_ID", create_voice_clone(name, description, audio))
+            # The new clone should show up in the voice lists, refetch them on the next run
+            if "VOICES" in st.session_state:
+                del st.session_state["VOICES"]
             
     step_4 = st.container(border=True)
     with step_4:
@@ -273,19 +540,28 @@ async def main():
             dst_lang = st.text_input("Target Language")
             submit_translation = st.form_submit_button("Submit")
 
-    if "TRANSLATED_TEXT" not in st.session_state and not submit_translation:
+    if "TRANSLATED_TEXT" not in st.session_state and "TRANSLATION_BATCH" not in st.session_state and not submit_translation:
         st.stop()
 
     if src_text != st.session_state["RECOGNIZED_TEXT"]:
         # User has edited the recognized text, update it and clear any downstream session_state items
         st.session_state["RECOGNIZED_TEXT"] = src_text
+        cancel_inflight("TRANSLATED_TEXT")
+        cancel_inflight("GENERATED_AUDIO")
         if "TRANSLATED_TEXT" in st.session_state:
             del st.session_state["TRANSLATED_TEXT"]
         if "GENERATED_AUDIO" in st.session_state:
             del st.session_state["GENERATED_AUDIO"]
 
     with st.spinner("Translating text..."):
-        translated_text = await translate_text(src_text, dst_lang)
+        translated_text = await submit("TRANSLATED_TEXT", translate_text(src_text, dst_lang))
+
+    if translated_text is None:
+        # Long transcripts go through the Batch API, which finishes in its own time
+        with step_4:
+            st.info("The translation has been submitted as a batch job, which can take a while to finish.")
+            st.button("Check translation status")
+        st.stop()
 
     if "TRANSLATED_TEXT" not in st.session_state:
         st.session_state["TRANSLATED_TEXT"] = translated_text
@@ -304,15 +580,17 @@ async def main():
     if dst_text != st.session_state["TRANSLATED_TEXT"]:
         # User has edited the translated text, update it and clear any downstream session_state items
         st.session_state["TRANSLATED_TEXT"] = dst_text
+        cancel_inflight("GENERATED_AUDIO")
         if "GENERATED_AUDIO" in st.session_state:
             del st.session_state["GENERATED_AUDIO"]
 
     with st.spinner("Generating audio..."):
-        audio = await generate_voice(voices[voice_name]["voice_id"], translated_text)
+        audio = await submit("GENERATED_AUDIO", generate_voice(voices[voice_name]["voice_id"], translated_text))
     
     if "GENERATED_AUDIO" not in st.session_state:
+        # Keep only the digest in session state, the bytes live in the shared audio store
         st.session_state["GENERATED_AUDIO"] = {
-            "audio": audio,
+            "digest": get_audio_store().put(audio),
             "name": voice_name,
             "timestamp": UTC_TIMESTAMP,
         }
@@ -320,19 +598,40 @@ async def main():
     step_6 = st.container(border=True)
     with step_6:
         st.write("**Step 6: Preview translated audio track**")
+        generated_audio = get_audio_store().get(st.session_state["GENERATED_AUDIO"]["digest"])
+        if generated_audio is None:
+            # Evicted from the shared store; let the user decide whether to pay for generating it again
+            del st.session_state["GENERATED_AUDIO"]
+            st.warning("The generated audio is no longer available, please submit Step 5 again to regenerate it.")
+            st.stop()
         with st.expander("Preview Audio"):
-            st.audio(st.session_state["GENERATED_AUDIO"]["audio"], format="audio/mp3")
-        st.markdown(
-            create_download_link(
-                st.session_state["GENERATED_AUDIO"]["audio"],
-                f'generated_voice_{st.session_state["GENERATED_AUDIO"]["name"]}_{st.session_state["GENERATED_AUDIO"]["timestamp"]}.mp3',
-            ),
-            unsafe_allow_html=True
+            st.audio(generated_audio, format="audio/mp3")
+        st.download_button(
+            "Download as mp3 file",
+            data=generated_audio,
+            file_name=f'generated_voice_{st.session_state["GENERATED_AUDIO"]["name"]}_{st.session_state["GENERATED_AUDIO"]["timestamp"]}.mp3',
+            mime="audio/mpeg",
+            # Downloading shouldn't rerun (and re-hash the upload for) the whole script
+            on_click="ignore",
         )
         submit_lip_syncing = st.button("Submit to Lip Syncing")
     
     if not submit_lip_syncing:
         st.stop()
 
+
+async def run():
+    # Share one HTTP session and one OpenAI client across all API calls of this script run
+    # HTTP/2 lets concurrent OpenAI requests share one multiplexed connection
+    http_client = httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=CONNECTION_LIMIT, max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS),
+        timeout=TIMEOUT,
+    )
+    async with AsyncOpenAI(http_client=http_client) as client, shared_session():
+        OPENAI_CLIENT.set(client)
+        await main()
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(run())
\ No newline at end of file
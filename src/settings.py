@@ -2,4 +2,21 @@
 TIMEOUT = 300
 RETRIES = 3
 DELAY = 30
-BACKOFF = 2
\ No newline at end of file
+BACKOFF = 2
+
+# Connection pooling
+CONNECTION_LIMIT = 100
+DNS_CACHE_TTL = 300
+MAX_KEEPALIVE_CONNECTIONS = 20
+
+# OpenAI Batch API
+BATCH_MIN_CHUNKS = 4
+
+# Caching
+TRANSCRIPTION_CACHE_SIZE = 256
+TRANSLATION_CACHE_SIZE = 256
+AUDIO_STORE_BYTES = 64 * 1024 * 1024
+
+# Audio extraction
+AUDIO_BITRATE = 128000
+PROGRESS_INTERVAL = 200
\ No newline at end of file
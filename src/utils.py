@@ -1,17 +1,119 @@
+import xxhash
+import io
+import threading
+import orjson
 import aiohttp
 from settings import *
 from loguru import logger
+from collections import OrderedDict
+from contextvars import ContextVar
+from contextlib import asynccontextmanager, nullcontext
 from tenacity import retry, stop_after_attempt, wait_exponential
 
-@retry(stop=stop_after_attempt(RETRIES), wait=wait_exponential(multiplier=BACKOFF, min=DELAY), reraise=True, retry_error_callback=logger.error)
-async def call_api(
-    method: str,
-    url: str,
+# Session shared by every API call within one script run, set by shared_session()
+SESSION: ContextVar[aiohttp.ClientSession | None] = ContextVar("SESSION", default=None)
+
+
+@asynccontextmanager
+async def shared_session():
+    # Keep one pooled session (and its TCP/TLS connections) alive for the whole script run
+    connector = aiohttp.TCPConnector(limit=CONNECTION_LIMIT, ttl_dns_cache=DNS_CACHE_TTL)
+    timeout = aiohttp.ClientTimeout(total=TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        token = SESSION.set(session)
+        try:
+            yield session
+        finally:
+            SESSION.reset(token)
+
+
+class PreallocatedBuffer(io.BytesIO):
+    # BytesIO that reserves its expected size up front, so writes fill the slab instead of repeatedly regrowing it
+    def __init__(self, size: int):
+        super().__init__()
+        self.end = 0
+        if size > 0:
+            # Writing one byte at the far end makes BytesIO allocate the whole range in a single step
+            self.seek(size - 1)
+            super().write(b"\0")
+            self.seek(0)
+
+    def write(self, data) -> int:
+        written = super().write(data)
+        self.end = max(self.end, self.tell())
+        return written
+
+    def finalize(self):
+        # Drop the unused tail of the reservation and rewind for reading
+        self.truncate(self.end)
+        self.seek(0)
+
+
+def digest(data) -> str:
+    # Fast content hash of a bytes-like object, used as a cache key for large buffers
+    return xxhash.xxh3_128_hexdigest(data)
+
+
+class LRUCache:
+    # Thread-safe mapping that evicts the least recently used entries beyond max_items
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __contains__(self, key) -> bool:
+        with self.lock:
+            return key in self.items
+
+    def put(self, key, value):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_items:
+                self.items.popitem(last=False)
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.items:
+                return None
+            self.items.move_to_end(key)
+            return self.items[key]
+
+
+class AudioStore:
+    # Thread-safe LRU of audio clips keyed by the digest of their bytes, evicting the oldest clips beyond max_bytes
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.items = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def put(self, data: bytes) -> str:
+        key = digest(data)
+        with self.lock:
+            if key not in self.items:
+                self.items[key] = data
+                self.size += len(data)
+            self.items.move_to_end(key)
+            # Never evict the clip that was just stored, even if it alone exceeds the budget
+            while self.size > self.max_bytes and len(self.items) > 1:
+                _, evicted = self.items.popitem(last=False)
+                self.size -= len(evicted)
+        return key
+
+    def get(self, key: str) -> bytes | None:
+        with self.lock:
+            if key not in self.items:
+                return None
+            self.items.move_to_end(key)
+            return self.items[key]
+
+
+def request_kwargs(
     headers: dict | None = None,
     params: dict | None = None,
     data: dict | aiohttp.FormData | None = None,
-    stream: bool = False,
-):
+) -> dict:
     kwargs = {
         "headers": headers,
         "params": params,
@@ -21,22 +123,54 @@ async def call_api(
             kwargs["json"] = data
         elif isinstance(data, aiohttp.FormData):
             kwargs["data"] = data
+    return {key: value for key, value in kwargs.items() if value is not None}
+
 
-    kwargs = {key: value for key, value in kwargs.items() if value is not None}
-    async with aiohttp.ClientSession() as session:
+def session_or_new(session: aiohttp.ClientSession | None = None):
+    # Reuse the shared session when there is one, otherwise fall back to a one-off session for this call
+    session = session or SESSION.get()
+    return nullcontext(session) if session else aiohttp.ClientSession()
+
+
+# Retries are left to the callers: they rebuild request bodies such as FormData, which can only be sent once
+async def call_api_once(
+    method: str,
+    url: str,
+    headers: dict | None = None,
+    params: dict | None = None,
+    data: dict | aiohttp.FormData | None = None,
+    session: aiohttp.ClientSession | None = None,
+):
+    async with session_or_new(session) as session:
+        async with session.request(
+            method=method,
+            url=url,
+            **request_kwargs(headers, params, data),
+        ) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"API call failed with status {resp.status}: {await resp.text()}")
+            # Match on the media type only, the header may carry parameters such as "; charset=utf-8"
+            if resp.headers.get("Content-Type", "").startswith("application/json"):
+                return orjson.loads(await resp.read())
+            return await resp.content.read()
+
+
+async def call_api_stream(
+    method: str,
+    url: str,
+    headers: dict | None = None,
+    params: dict | None = None,
+    data: dict | aiohttp.FormData | None = None,
+    session: aiohttp.ClientSession | None = None,
+):
+    async with session_or_new(session) as session:
         async with session.request(
             method=method,
             url=url,
-            **kwargs,
+            **request_kwargs(headers, params, data),
         ) as resp:
             if resp.status != 200:
                 raise RuntimeError(f"API call failed with status {resp.status}: {await resp.text()}")
-            if stream:
-                async for line in resp.content:
-                    chunk = line.decode("utf-8").strip()
-                    yield chunk
-            else:
-                if resp.headers["Content-Type"] == "application/json":
-                    yield await resp.json()
-                else:
-                    yield await resp.content.read()
\ No newline at end of file
+            async for line in resp.content:
+                chunk = line.decode("utf-8").strip()
+                yield chunk
\ No newline at end of file